@@ -7,23 +7,58 @@ Parameters:
         Set to -1 to disable.
 """
 
+from functools import lru_cache, partial
+from os.path import getmtime
+
 import pywavefront
-from os.path import splitext
 
 DEFAULT_MIN_VERTS = -1
 DEFAULT_MAX_VERTS = -1
 ACCEPTABLE_EXTENSION = ".obj"
+LOADED_OBJ_CACHE_SIZE = 128
+VERTEX_PREFIXES = (b"v ", b"v\t")
+INDENTED_LINE_STARTS = (b"\n ", b"\n\t")
+READ_CHUNK_SIZE = 1024 * 1024
+
+@lru_cache(maxsize=LOADED_OBJ_CACHE_SIZE)
+def load_obj(path, mtime):
+    # mtime is only part of the cache key, so an OBJ is re-parsed if it changes
+    return pywavefront.Wavefront(path, create_materials=True, collect_faces=False)
+
+def count_vertices(path):
+    # count the vertex position records without parsing anything, by searching
+    # the raw bytes for lines starting with 'v' - 'vn' and 'vt' lines won't match.
+    # returns None if the file has indented lines, as those could be records too
+    count = 0
+    # the start of the file counts as the start of a line
+    carried = b"\n"
+    with open(path, "rb") as obj_file:
+        # read in chunks so huge files don't have to fit in memory all at once
+        for chunk in iter(partial(obj_file.read, READ_CHUNK_SIZE), b""):
+            data = carried + chunk
+            if any(line_start in data for line_start in INDENTED_LINE_STARTS):
+                return None
+            for prefix in VERTEX_PREFIXES:
+                count += data.count(b"\n" + prefix)
+            # carry over the end of this chunk, in case a record starts across the gap -
+            # anything shorter than a whole '\nv ' can't have been counted already
+            carried = data[-2:]
+    return count
 
 def check(path, params):
     min_verts = params.get("min_verts", DEFAULT_MIN_VERTS)
     max_verts = params.get("max_verts", DEFAULT_MAX_VERTS)
     
-    _, ext = splitext(path)
-    if ext.lower() != ACCEPTABLE_EXTENSION:
+    # only the end of the path needs lowercasing to compare the extension
+    if path[-len(ACCEPTABLE_EXTENSION):].lower() != ACCEPTABLE_EXTENSION:
         return False, f"file '{path}' was not an OBJ file"
     
-    scene = pywavefront.Wavefront(path, create_materials=True)
-    vert_count = len(scene.vertices)
+    vert_count = count_vertices(path)
+    if vert_count is None or vert_count == 0:
+        # make sure by parsing the file properly, as the OBJ was written in an
+        # unusual way (like with indented lines) that counting can't handle
+        scene = load_obj(path, getmtime(path))
+        vert_count = len(scene.vertices)
     
     if min_verts != -1:
         if vert_count < min_verts:
@@ -31,6 +66,6 @@ def check(path, params):
 
     if max_verts != -1:
         if vert_count > max_verts:
-            return False, f"file '{path}' vertex count '{vert_count}' exceeded max count '{min_verts}'"
+            return False, f"file '{path}' vertex count '{vert_count}' exceeded max count '{max_verts}'"
 
     return True, ""
@@ -25,15 +25,37 @@ Author:
     Sam Gibson <samolivergibson@gmail.com>
 """
 
-from os import listdir
-from os.path import isfile, isdir, join, exists
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from os import cpu_count, scandir
+import sys
+from types import MappingProxyType
 
-from colorama import Fore, Style
 import colorama
 
+import sanity.fs
 import sanity.rules
 from sanity.moduleloader import load_checker_modules
-from sanity.util import print_depth
+from sanity.util import print_depth, flush_output, NoColor
+
+USE_COLOR = sys.stdout.isatty()
+"""bool: Whether or not to print color codes. Only done when printing to a terminal,
+as otherwise they'd end up in the output."""
+
+if USE_COLOR:
+    from colorama import Fore, Style
+else:
+    Fore = Style = NoColor
+
+EMPTY_PARAMS = MappingProxyType({})
+"""Mapping: The params given to checkers that weren't parameterised in the config file.
+Read-only, so that it can be shared between all of them."""
+
+MAX_CHECK_WORKERS = min(32, (cpu_count() or 1) * 4)
+"""int: The max number of threads used to run file checks concurrently. Checkers
+tend to spend most of their time waiting on the disk, so this is more than the
+number of CPUs, but capped as more threads than this just contend for the disk
+and the GIL on machines with lots of CPUs."""
 
 class CheckerContext:
     """Encapsulates all data needed to check the sanity of a directory of files.
@@ -47,41 +69,62 @@ class CheckerContext:
         ContextCreationError: if there was an error creating the checker context.
 
     Attributes:
-        checkers (dict[str, func]): Maps checker names to check() functions as
-            loaded from modules.
+        checkers (LazyCheckerDict): Maps checker names to check() functions as
+            loaded from modules. Modules are only loaded if a rule uses them.
         file_rules (dict[str, FileCheckerRule]): Maps file name rule
             regexes to FileCheckerRule objects, storing compiled file name regexes
-            and an array of compiled checker name regexes. To be used for running certain
+            and combined checker name regexes. To be used for running certain
             checkers on certain files.
+        file_rules_prefilter (re.Pattern): Matches the names of files that at least
+            one of the file rules would match, or None if it wouldn't skip any files.
         dir_rules (list[re.Pattern]): Stores the compiled regexes for figuring out
             which checkers to run on the entire directory.
-        checker_params: A dictionary containing checker parameters. Maps checker names
-            to dictionaries of parameter names/values.
+        group_by_extension (bool): Whether any of the file rules only match files
+            with a certain extension, so files should be grouped by extension before
+            matching them against the rules.
+        checker_dispatch (dict[tuple[re.Pattern], tuple[(str, func, Mapping)]]): Maps
+            the compiled checker name regexes of every file and directory rule to the
+            checkers they match along with their params, so checkers don't have to be
+            matched each time a rule is run.
+        dir_checkers (tuple[(str, func, Mapping)]): The checkers matched by each of
+            the directory rules in turn along with their params, to run on every
+            directory.
+        checker_params: A dictionary containing checker parameters. Maps the name of
+            every loaded checker to a dictionary of parameter names/values, which is
+            EMPTY_PARAMS if it wasn't given any in the config file.
         recursive (bool): Whether or not to recurse into subdirectories when checking sanity.
+        executor (ThreadPoolExecutor): The thread pool used to run file checks on.
     """
     def __init__(self, config, directory):
-        # try and load the checker modules from the directory in the loaded config
+        # try and find the checker modules in the directory in the loaded config
         try:
             self.checkers = load_checker_modules(config.checker_dir)
         except ValueError as exc:
             raise ContextCreationError(f"Could not load checker modules, {str(exc)}")
-        except ImportError as exc:
-            raise ContextCreationError(f"Could not load module, {str(exc)}")
 
-        # try and load the file checker rules
-        try:
-            self.file_rules = sanity.rules.compile_file_rules(config.file_rules)
-        except sanity.rules.RuleError as exc:
-            raise ContextCreationError(f"Could not compile file rules, {str(exc)}")
+        # the rules were already compiled when the config was loaded
+        self.file_rules = config.file_rules
+        self.file_rules_prefilter = config.file_rules_prefilter
+        self.dir_rules = config.dir_rules
+        self.group_by_extension = any(rule.extension is not None for rule in self.file_rules.values())
 
-        # try to load the directory checker rules
-        try:
-            self.dir_rules = sanity.rules.compile_directory_rules(config.dir_rules)
-        except sanity.rules.RuleError as exc:
-            raise ContextCreationError(f"Could not compile directory rules, {str(exc)}")
+        # give every checker its params up front, so running a check is just a lookup
+        self.checker_params = {name: config.checker_params.get(name, EMPTY_PARAMS)
+                               for name in self.checkers}
 
-        self.checker_params = config.checker_params
+        # work out which checkers each of the rules will run ahead of time, this is
+        # also where the modules for those checkers get loaded
+        checker_rules = [rule.checker_names for rule in self.file_rules.values()]
+        checker_rules.extend((dir_rule,) for dir_rule in self.dir_rules)
+        try:
+            self.checker_dispatch = sanity.rules.build_checker_dispatch(
+                self.checkers, checker_rules, self.checker_params)
+        except ImportError as exc:
+            raise ContextCreationError(f"Could not load module, {str(exc)}")
+        self.dir_checkers = tuple(chain.from_iterable(self.checker_dispatch[(dir_rule,)]
+                                                      for dir_rule in self.dir_rules))
         self.recursive = config.recursive
+        self.executor = ThreadPoolExecutor(max_workers=MAX_CHECK_WORKERS)
 
 class ContextCreationError(Exception):
     """Raised by constructor of CheckerContext."""
@@ -91,6 +134,57 @@ class ContextCreationError(Exception):
     def __str__(self):
         return f"{self.reason}"
 
+def scan_directory(directory):
+    """Scan a directory once, splitting its entries into files and directories.
+
+    Uses the file type information returned when reading the directory, so no
+    extra stat() call is needed per entry on most platforms.
+
+    Args:
+        directory (str): The directory to scan.
+
+    Returns:
+        (list[(str, str)], list[str], list[os.DirEntry]): The names and full paths
+        of the files, the full paths of the directories, and the directory entries
+        of the files in the given directory.
+    """
+    files = []
+    dirs = []
+    file_entries = []
+    with scandir(directory) as entries:
+        for entry in entries:
+            # entries that can't be checked are neither, like os.path.isfile(...)
+            if sanity.fs.entry_is_file(entry):
+                files.append((entry.name, entry.path))
+                file_entries.append(entry)
+            elif sanity.fs.entry_is_dir(entry):
+                dirs.append(entry.path)
+    return files, dirs, file_entries
+
+def walk_directory(directory, recursive):
+    """Walk a directory top-down, scanning each directory visited exactly once.
+
+    Directories are visited in the same order as a depth-first recursion would
+    visit them, but without any recursion.
+
+    Args:
+        directory (str): The directory to start walking from.
+        recursive (bool): Whether or not to walk into subdirectories.
+
+    Yields:
+        (str, list[(str, str)], list[os.DirEntry]): The path of each directory
+        visited, the names and full paths of the files in it, and the directory
+        entries of those files.
+    """
+    pending_dirs = [directory]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        files, dirs, file_entries = scan_directory(current_dir)
+        yield current_dir, files, file_entries
+        if recursive:
+            # push these in reverse so they get popped in the order they were scanned
+            pending_dirs.extend(reversed(dirs))
+
 def run_check(check_func, path, checker_name, checker_params):
     """Run a single check against a single target path (file or directory).
 
@@ -109,32 +203,40 @@ def run_check(check_func, path, checker_name, checker_params):
     """
     # run the check function, passing in any required state, print and return the result
     result, reason = check_func(path, checker_params)
+    return report_check(path, checker_name, result, reason)
+
+def report_check(path, checker_name, result, reason):
+    """Print the result of a single check that has been run.
+
+    Args:
+        path (str): The target path the check was run against.
+        checker_name (str): The name of the checker that was run.
+        result (bool): Whether or not the check was a success.
+        reason (str): The reason the check failed, if it did.
+
+    Returns:
+        True if the check was a success, False otherwise.
+    """
     if result is True:
         print_depth(f"[{Fore.GREEN}PASS{Style.RESET_ALL}] - {checker_name} on {path}", 2)
     else:
         print_depth(f"[{Fore.RED}FAIL{Style.RESET_ALL}] - {checker_name} on {path}, reason: {reason}", 2)
     return result
 
-def process_checker(path, checker_regex, checkers, config_params):
-    """Process a single checker rule. A checker rule is a regex that will match
-    to any number of checker modules loaded from the checkers directory.
+def process_checkers(path, checkers):
+    """Run some checkers, matched from the checker rules, one after the other.
 
     Args:
         path (str): The path to what we're checking right now. Could be a file
             or a directory.
-        checker_regex (re.Pattern): The compiled regex to match checker names
-            against, to figure out which ones to run.
-        checkers (dict[str, func]): The checkers loaded in from the checker modules
-            directory.
-        config_params (dict[str, dict[str, value]]): The params loaded from the config
-            file.
+        checkers (iterable[(str, func, Mapping)]): The names, check() functions and
+            params of the checkers to run.
 
     Returns:
         True if all the checks succeeded, False otherwise.
     """
     status = True
-    for checker_name, checker_func in sanity.rules.filter_checkers(checkers, checker_regex):
-        checker_params = config_params.get(checker_name, {})
+    for checker_name, checker_func, checker_params in checkers:
         success = run_check(checker_func, path, checker_name, checker_params)
         
         # if at least one check failed we want to indicate this
@@ -142,40 +244,63 @@ def process_checker(path, checker_regex, checkers, config_params):
             status = False
     return status
     
-def process_file_rule(rule_name, file_rule, files, checkers, config_params):
-    """Process a file rule parsed from the config file.
+def submit_file_rule(file_rule, files, checker_dispatch, executor):
+    """Start running all of the checks for a file rule parsed from the config file.
+
+    Args:
+        file_rule (FileCheckerRule): The rule to run.
+        files (list[(str, str)]): An unfiltered array of the names and paths of
+            files in the assets directory.
+        checker_dispatch (dict[tuple[re.Pattern], tuple[(str, func, Mapping)]]): Maps
+            the checker name regexes of each rule to the loaded checkers they match,
+            along with their params.
+        executor (ThreadPoolExecutor): The thread pool to run the checks on.
+
+    Returns:
+        list[(str, str, Future)]: The path, checker name, and pending result of each
+        check that was started.
+    """
+    pending_checks = []
+    # filter out which files we care about based on the rule
+    checkers = checker_dispatch[file_rule.checker_names]
+    for file in sanity.rules.filter_files(files, file_rule.file_name):
+        # start the checkers matched by the rule
+        for checker_name, checker_func, checker_params in checkers:
+            future = executor.submit(checker_func, file, checker_params)
+            pending_checks.append((file, checker_name, future))
+    return pending_checks
+
+def process_file_rule(rule_name, pending_checks):
+    """Process a file rule parsed from the config file, waiting for each of its
+    checks to finish and printing their results in the order they were started.
 
     Args:
         rule_name (str): The regex of the rule, to match against
             file names.
-        file_rule (FileCheckerRule): The rule to run.
-        files (list[str]): An unfiltered array of files in the assets directory.
-        checkers (dict[str, func]): The loaded checker modules.
-        config_params (dict[str, dict[str, value]]): The params loaded from the config
-            file.
+        pending_checks (list[(str, str, Future)]): The checks started for this rule
+            by submit_file_rule(...)
 
     Returns:
         True if all the checks succeeded, False otherwise.
     """
     print_depth(f"Processing file rule: '{rule_name}'", 1)
     status = True
-    # filter out which files we care about based on the rule
-    for file in sanity.rules.filter_files(files, file_rule.file_name):
-        # process each regex in the rule
-        for checker_regex in file_rule.checker_names:
-            success = process_checker(file, checker_regex, checkers, config_params)
-            # if at least one check failed we want to indicate this
-            if not success:
-                status = False
+    for file, checker_name, future in pending_checks:
+        result, reason = future.result()
+        success = report_check(file, checker_name, result, reason)
+        # if at least one check failed we want to indicate this
+        if not success:
+            status = False
     return status
 
-def check_on_directory(context, directory):
-    """Perform a sanity check on a given directory.
+def check_in_directory(context, directory, files_in_dir):
+    """Perform a sanity check on a single directory, without recursing.
 
     Args:
         context (CheckerContext): The context to use. Cannot be None.
-        directory (str): The directory to check the sanity of. Files and directories
-            within will be checked.
+        directory (str): The directory to check the sanity of.
+        files_in_dir (list[(str, str)]): The names and paths of the files in the
+            directory, as scanned by scan_directory(...)
 
     Returns:
         True if all checks passed, False otherwise.
@@ -186,25 +311,38 @@ def check_on_directory(context, directory):
     directory_check_result = True
     if len(context.dir_rules) > 0:
         print_depth(f"Processing checks for directory: {directory}", 1)
-        # for all of the given directory checker regexes, process them
-        for dir_check_regex in context.dir_rules:
-            success = process_checker(directory, dir_check_regex, context.checkers, context.checker_params)
-            # if any check fails we want to show this
-            if not success:
-                directory_check_result = False
+        # the checkers for all of the given directory checker regexes were matched
+        # up front, so just run them
+        directory_check_result = process_checkers(directory, context.dir_checkers)
         if directory_check_result:
             print_depth(f"{Fore.GREEN}Directory checks PASSED on {directory}!{Style.RESET_ALL}", 1)
         else:
             print_depth(f"{Fore.RED}Directory checks FAILED on {directory}.{Style.RESET_ALL}", 1)
 
-    # get the asset files we want to check
-    files_in_dir = [join(directory, f) for f in listdir(directory) if isfile(join(directory, f))]
-    
-    # for all of the given file rules, run the associated checks
-    file_check_result = True
+    # skip any files that none of the file rules match before matching each rule
+    if context.file_rules_prefilter is not None:
+        prefilter = context.file_rules_prefilter.fullmatch
+        files_in_dir = [(name, path) for name, path in files_in_dir if prefilter(name)]
+
+    # rules that need a certain extension only have to be matched against files with it
+    files_by_extension = {}
+    if context.group_by_extension:
+        files_by_extension = sanity.rules.group_files_by_extension(files_in_dir)
+
+    # start the checks for all of the given file rules, so they can run concurrently
+    pending_rules = []
     for rule_name, file_rule in context.file_rules.items():
-        success = process_file_rule(rule_name, file_rule, files_in_dir, 
-                                           context.checkers, context.checker_params)
+        rule_files = files_in_dir
+        if file_rule.extension is not None:
+            rule_files = files_by_extension.get(file_rule.extension, [])
+        pending_checks = submit_file_rule(file_rule, rule_files, context.checker_dispatch,
+                                          context.executor)
+        pending_rules.append((rule_name, pending_checks))
+
+    # now collect the results of the associated checks
+    file_check_result = True
+    for rule_name, pending_checks in pending_rules:
+        success = process_file_rule(rule_name, pending_checks)
         # if any check fails we want to show this
         if not success:
             file_check_result = False
@@ -213,18 +351,35 @@ def check_on_directory(context, directory):
     else:
         print_depth(f"{Fore.RED}File checks FAILED in {directory}.{Style.RESET_ALL}", 1)
 
-    # check to see if we should recurse into subdirectories
-    recursive_result = True
-    if (context.recursive):
-        dirs_in_dir = [d for d in listdir(directory) if isdir(join(directory, d))]
+    # write out everything printed for this directory in one go
+    flush_output()
+
+    return directory_check_result and file_check_result
 
-        for d in dirs_in_dir:
-            new_dir_path = join(directory, d)
-            success = check_on_directory(context, new_dir_path)
-            if not success:
-                recursive_result = False
+def check_on_directory(context, directory):
+    """Perform a sanity check on a given directory.
+
+    Args:
+        context (CheckerContext): The context to use. Cannot be None.
+        directory (str): The directory to check the sanity of. Files and directories
+            within will be checked, recursing into subdirectories if the context
+            is recursive.
 
-    return directory_check_result and file_check_result and recursive_result
+    Returns:
+        True if all checks passed, False otherwise.
+    """
+    status = True
+    for current_dir, files_in_dir, file_entries in walk_directory(directory, context.recursive):
+        # share what's known about the files with the checkers while they're checked
+        sanity.fs.remember_entries(file_entries)
+        try:
+            success = check_in_directory(context, current_dir, files_in_dir)
+        finally:
+            sanity.fs.forget_entries()
+        # if any directory fails we want to show this, but still check the rest
+        if not success:
+            status = False
+    return status
 
 
 def check(context, directory):
@@ -233,13 +388,18 @@ def check(context, directory):
     Directory must exist, and context cannot be None.
     """
     # init colorama for Windows terminal color support
-    colorama.init()
+    if USE_COLOR:
+        colorama.init()
 
-    # perform the checks
-    success = check_on_directory(context, directory)
+    # perform the checks, making sure anything printed is written out if a checker fails
+    try:
+        success = check_on_directory(context, directory)
+    finally:
+        flush_output()
 
     # output the result
     if success:
         print_depth(f"{Fore.GREEN}All checks PASSED!{Style.RESET_ALL}")
     else:
-        print_depth(f"{Fore.RED}Some checks FAILED.{Style.RESET_ALL}")
\ No newline at end of file
+        print_depth(f"{Fore.RED}Some checks FAILED.{Style.RESET_ALL}")
+    flush_output()
\ No newline at end of file
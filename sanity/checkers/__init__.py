@@ -7,9 +7,8 @@ Author:
     Sam Gibson <samolivergibson@gmail.com>
 """
 
-from os import listdir
-from os.path import isfile, join
+import sanity.fs
 
 def list_files(directory):
     """Get a list of all files in a directory."""
-    return [name for name in listdir(directory) if isfile(join(directory, name))]
\ No newline at end of file
+    return [entry.name for entry in sanity.fs.iter_files(directory)]
\ No newline at end of file
@@ -7,21 +7,31 @@ Parameters:
         Set to -1 to disable this check.
 """
 
-from os import listdir
-from os.path import isfile, join
-
-from sanity.checkers import list_files
+import sanity.fs
 
 DEFAULT_MAX_FILE_COUNT = 10
 DEFAULT_MIN_FILE_COUNT = 1
 
-def get_file_count(directory):
-    return len(list_files(directory))
+def get_file_count(directory, stop_at=None):
+    # stop counting early once stop_at files have been found, if it's given
+    filecount = 0
+    for _ in sanity.fs.iter_files(directory):
+        filecount += 1
+        if filecount == stop_at:
+            break
+    return filecount
 
 def check(path, params):
     max_filecount_param = params.get("max_file_count", DEFAULT_MAX_FILE_COUNT)
     min_filecount_param = params.get("min_file_count", DEFAULT_MIN_FILE_COUNT)
-    filecount = get_file_count(path)
+
+    # there's no need to keep counting once we know whether the check will pass
+    stop_at = None
+    if max_filecount_param != -1:
+        stop_at = max(max_filecount_param + 1, min_filecount_param)
+    elif min_filecount_param != -1:
+        stop_at = min_filecount_param
+    filecount = get_file_count(path, stop_at)
     
     if min_filecount_param != -1:
         if filecount < min_filecount_param:
@@ -29,6 +39,7 @@ def check(path, params):
         
     if max_filecount_param != -1:
         if filecount > max_filecount_param:
-            return False, f"file count exceeded max: '{max_filecount_param}', found: {filecount}"
+            found = f"at least {filecount}" if filecount == stop_at else filecount
+            return False, f"file count exceeded max: '{max_filecount_param}', found: {found}"
 
     return True, ""
\ No newline at end of file
@@ -4,17 +4,21 @@ Parameters:
     files_list (list[str]): The list of files that need to be present.
 """
 
-from os import listdir
-from os.path import isfile, join
-
-from sanity.checkers import list_files
+import sanity.fs
 
 DEFAULT_FILES_LIST = []
 
 def check(path, params):
     files_list_param = params.get("files_list", DEFAULT_FILES_LIST)
-    file_list = list_files(path)
+    missing_files = set(files_list_param)
+    if missing_files:
+        # only the entries named in the list need checking to see if they're files
+        for entry in sanity.fs.iter_files(path, missing_files.__contains__):
+            missing_files.discard(entry.name)
+            # stop looking as soon as every file has been found
+            if not missing_files:
+                break
     for f in files_list_param:
-        if f not in file_list:
+        if f in missing_files:
             return False, f"file '{f}' was not in directory."
     return True, ""
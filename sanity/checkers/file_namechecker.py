@@ -4,14 +4,29 @@ Parameters:
     filename_pattern (str): A regex that the filename should match.
 """
 
+from functools import lru_cache
 import re
 
+import sanity.rules
+
 DEFAULT_FILENAME_PATTERN = "^.*$"
+COMPILED_PATTERN_CACHE_SIZE = 256
+
+@lru_cache(maxsize=COMPILED_PATTERN_CACHE_SIZE)
+def compile_pattern(pattern):
+    # simple patterns, like the default, can skip the regex engine
+    return sanity.rules.get_fast_matcher(pattern, re.compile(pattern))
+
+DEFAULT_COMPILED_PATTERN = compile_pattern(DEFAULT_FILENAME_PATTERN)
 
 def check(path, params):
-    filename_pattern_param = params.get("filename_pattern", DEFAULT_FILENAME_PATTERN)
-    filename_pattern = re.compile(filename_pattern_param)
+    if "filename_pattern" in params:
+        filename_pattern_param = params["filename_pattern"]
+        filename_pattern = compile_pattern(filename_pattern_param)
+    else:
+        filename_pattern_param = DEFAULT_FILENAME_PATTERN
+        filename_pattern = DEFAULT_COMPILED_PATTERN
     if filename_pattern.match(path):
         return True, ""
     else:
-        return False, f"{path} did not match pattern '{params['filename_pattern']}'"
\ No newline at end of file
+        return False, f"{path} did not match pattern '{filename_pattern_param}'"
\ No newline at end of file
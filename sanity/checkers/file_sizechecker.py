@@ -5,7 +5,7 @@ Parameters:
     max_size (int): The maximum file size acceptable (in bytes). Set to -1 to disable.
 """
 
-from os.path import getsize
+from sanity.fs import stat
 
 DEFAULT_MIN_SIZE = -1
 DEFAULT_MAX_SIZE = -1
@@ -13,7 +13,11 @@ DEFAULT_MAX_SIZE = -1
 def check(path, params):
     min_size = params.get("min_size", DEFAULT_MIN_SIZE)
     max_size = params.get("max_size", DEFAULT_MAX_SIZE)
-    file_size = getsize(path)
+    # don't bother fetching the size if there's nothing to check it against
+    if min_size == -1 and max_size == -1:
+        return True, ""
+
+    file_size = stat(path).st_size
     if min_size != -1:
         if file_size < min_size:
             return False, f"file size '{file_size}' byte(s) was smaller than minimum '{min_size}'"
@@ -5,7 +5,10 @@ Author:
     Sam Gibson <samolivergibson@gmail.com>
 """
 
-import yaml
+from functools import lru_cache
+import json
+import os
+
 import sanity.rules
 
 REQUIRED_KEYS = [
@@ -14,10 +17,22 @@ REQUIRED_KEYS = [
 """str: The keys in the YAML config file that are required. An exception will be thrown
 when loading the config file if any of these are not present."""
 
-DEFAULT_FILE_RULES = [
-    {"^.*$": ["^.*$"]}
-]
-"""list[dict[str, list[str]]]: Used if no rules are given. Runs all checkers for all files."""
+CONFIG_CACHE_SUFFIX = ".cache.json"
+"""str: Appended to the path of a config file to get the path of the JSON file its
+parsed contents are cached in."""
+
+PARSED_CONFIG_CACHE_SIZE = 32
+"""int: The max number of parsed Config objects to keep in memory, so parsing the same
+config file again doesn't need to touch it."""
+
+DEFAULT_FILE_RULES = {
+    "^.*$": ["^.*$"]
+}
+"""dict[str, list[str]]: Used if no rules are given. Runs all checkers for all files."""
+
+DEFAULT_COMPILED_FILE_RULES = sanity.rules.compile_file_rules(DEFAULT_FILE_RULES)
+"""dict[str, FileCheckerRule]: DEFAULT_FILE_RULES compiled, so that config files without
+any rules don't have to compile them again."""
 
 DEFAULT_PARAMETERS = {}
 """dict[str, value]: Used if no parameters are given. Doesn't set anything."""
@@ -28,26 +43,40 @@ DEFAULT_DIRECTORY_RULES = []
 class Config:
     """Config stores parsed values from the config YAML file.
 
+    The rules in the config file are compiled here, so that they're only ever
+    compiled once per config file.
+
     Args:
         config_yaml (dict): Parsed YAML config file.
 
+    Raises:
+        RuleError: If there was an error compiling any of the rules.
+
     Attributes:
         checker_dir (str): The directory of checker modules to use.
-        file_rules (list[dict[str, list[str]]]): Rules concerning filenames
-            and checkers to run against them. An array of dicts mapping filenames to
-            names of checkers to run against this filename. Supports regexes for
-            both filenames and checker names, simply enclose regex in '^' and '$'.
+        file_rules (dict[str, FileCheckerRule]): Compiled rules concerning filenames
+            and checkers to run against them. Maps filename regexes to rules storing
+            the compiled filename regex and the compiled regex of the names of checkers
+            to run against matching files. Compiled from a dict mapping filename regexes
+            to lists of checker name regexes.
+        file_rules_prefilter (re.Pattern): Matches the names of files that at least
+            one of the file rules would match, or None if it wouldn't skip any files.
         checker_params (dict): Allows variables in checkers to be set. Maps
             names of checkers to values to pass into their checker function.
-        directory_rules (list[str]): An array of checker name regexes to run on
+        dir_rules (list[re.Pattern]): The compiled checker name regexes to run on
             the entire directory as opposed to individual files.
         recursive (bool): Whether or not to recurse to subdirs when checking sanity.
     """
     def __init__(self, config_yaml):
         self.checker_dir = config_yaml["checker_dir"]
-        self.file_rules = config_yaml.get("file_rules", DEFAULT_FILE_RULES)
+        if "file_rules" in config_yaml:
+            self.file_rules = sanity.rules.compile_file_rules(config_yaml["file_rules"])
+        else:
+            self.file_rules = DEFAULT_COMPILED_FILE_RULES
+        self.file_rules_prefilter = sanity.rules.compile_file_rules_prefilter(self.file_rules)
         self.checker_params = config_yaml.get("parameters", DEFAULT_PARAMETERS)
-        self.dir_rules = config_yaml.get("directory_rules", DEFAULT_DIRECTORY_RULES)
+        self.dir_rules = sanity.rules.compile_directory_rules(
+            config_yaml.get("directory_rules", DEFAULT_DIRECTORY_RULES))
         self.recursive = config_yaml.get("recursive", False)
             
 
@@ -78,9 +107,75 @@ def validate_config(config_yaml):
             return False, key
     return True, ""
 
+def load_cached_config(yaml_file, mtime_ns, size):
+    """Try loading a config file's parsed YAML from its JSON cache, which is much
+    quicker than parsing the YAML again.
+
+    Args:
+        yaml_file (str): The path to the YAML config file.
+        mtime_ns (int): The modification time of the YAML config file in nanoseconds.
+        size (int): The size of the YAML config file in bytes.
+
+    Returns:
+        dict: The parsed YAML config file, or None if there wasn't an up to date cache.
+    """
+    try:
+        with open(yaml_file + CONFIG_CACHE_SUFFIX, 'r') as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    # the cache is only up to date if the config file hasn't changed since it was written
+    if not isinstance(cache, dict):
+        return None
+    if cache.get("mtime_ns") != mtime_ns or cache.get("size") != size:
+        return None
+    return cache.get("config")
+
+def save_cached_config(yaml_file, mtime_ns, size, parsed_yaml_config):
+    """Try caching a config file's parsed YAML as JSON, so it can be loaded quicker
+    next time. Does nothing if the config couldn't be cached.
+
+    Args:
+        yaml_file (str): The path to the YAML config file.
+        mtime_ns (int): The modification time of the YAML config file in nanoseconds.
+        size (int): The size of the YAML config file in bytes.
+        parsed_yaml_config (dict): The parsed YAML config file.
+    """
+    cache = {
+        "mtime_ns": mtime_ns,
+        "size": size,
+        "config": parsed_yaml_config
+    }
+    try:
+        cache_json = json.dumps(cache)
+    except (TypeError, ValueError):
+        return
+
+    # YAML can store things JSON can't (like non-string keys), which would come
+    # back different if they were cached, so only cache it if it comes back the same
+    if json.loads(cache_json) != cache:
+        return
+
+    # write to a temporary file first, so a half-written cache is never loaded
+    cache_path = yaml_file + CONFIG_CACHE_SUFFIX
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w') as cache_file:
+            cache_file.write(cache_json)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # not being able to cache is fine, like if the directory is read-only
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
 def parse_config(yaml_file):
     """Parse a config YAML file to a Config object.
 
+    Parsing the same unchanged file again returns the same Config object.
+
     Args:
         yaml_file (str): The path to the YAML config file.
 
@@ -90,20 +185,58 @@ def parse_config(yaml_file):
     Raises:
         ConfigError: If the config file could not be loaded.
     """
-
-    # first try loading and parsing the config file
-    parsed_yaml_config = None
     try:
-        with open(yaml_file, 'r') as config_file:
-            parsed_yaml_config = yaml.safe_load(config_file)
-    except yaml.YAMLError as exc:
-        raise ConfigError("Unable to parse config file", exc)
+        yaml_stat = os.stat(yaml_file)
     except OSError as exc:
         raise ConfigError("Unable to open config file", exc)
+    return parse_config_file(os.path.abspath(yaml_file), yaml_stat.st_mtime_ns, yaml_stat.st_size)
+
+@lru_cache(maxsize=PARSED_CONFIG_CACHE_SIZE)
+def parse_config_file(yaml_file, mtime_ns, size):
+    """Parse a config YAML file to a Config object, remembering the result for as
+    long as the file stays the same.
+
+    Args:
+        yaml_file (str): The absolute path to the YAML config file.
+        mtime_ns (int): The modification time of the YAML config file in nanoseconds.
+        size (int): The size of the YAML config file in bytes.
+
+    Returns:
+        Config: An instance of Config populated with data from the YAML file.
+
+    Raises:
+        ConfigError: If the config file could not be loaded.
+    """
+    # first try loading the config file from its cache, then try parsing it
+    parsed_yaml_config = load_cached_config(yaml_file, mtime_ns, size)
+    if parsed_yaml_config is None:
+        # yaml is slow to import, so only import it when there's some YAML to parse
+        import yaml
+        # use the much faster libyaml based loader if PyYAML was built with it
+        try:
+            from yaml import CSafeLoader as YamlLoader
+        except ImportError:
+            from yaml import SafeLoader as YamlLoader
+
+        # read the whole file in one go and hand the bytes to the parser, rather than
+        # having it read from the file in small chunks
+        try:
+            with open(yaml_file, 'rb') as config_file:
+                config_data = config_file.read()
+        except OSError as exc:
+            raise ConfigError("Unable to open config file", exc)
+        try:
+            parsed_yaml_config = yaml.load(config_data, Loader=YamlLoader)
+        except yaml.YAMLError as exc:
+            raise ConfigError("Unable to parse config file", exc)
+        save_cached_config(yaml_file, mtime_ns, size, parsed_yaml_config)
 
     # now check that it's valid
     valid, missing_key = validate_config(parsed_yaml_config)
     if not valid:
         raise ConfigError(f"File missing required key: {missing_key}")
-    
-    return Config(parsed_yaml_config)
\ No newline at end of file
+
+    try:
+        return Config(parsed_yaml_config)
+    except sanity.rules.RuleError as exc:
+        raise ConfigError("Could not compile rules", exc)
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Defines functions for getting information about files on the disk, which can be
+used by checkers.
+
+While a directory is being checked, what's already known about the files in it
+from scanning the directory is shared here, so that checkers don't have to get it
+from the disk again.
+
+Author:
+    Sam Gibson <samolivergibson@gmail.com>
+"""
+
+import os
+
+FILE_ENTRIES = {}
+"""dict[str, os.DirEntry]: Maps the paths of the files in the directory currently being
+checked to their directory entries. A DirEntry caches the result of its stat() call,
+so it's shared by every checker that needs it."""
+
+def remember_entries(entries):
+    """Share the directory entries of the files about to be checked.
+
+    Args:
+        entries (list[os.DirEntry]): The directory entries to share.
+    """
+    FILE_ENTRIES.update((entry.path, entry) for entry in entries)
+
+def forget_entries():
+    """Stop sharing directory entries, once their files have been checked."""
+    FILE_ENTRIES.clear()
+
+def iter_files(directory, name_filter=None):
+    """Iterate over the files in a directory, skipping anything that isn't a file,
+    or that can't be checked, like a symlink that loops back on itself.
+
+    Args:
+        directory (str): The directory to look in.
+        name_filter (func): Given the name of each entry, returns whether to
+            include it. Entries are only checked to see if they're files once
+            their name has passed, so unwanted entries are skipped cheaply. If
+            None, every file is included.
+
+    Yields:
+        os.DirEntry: The directory entry of each file.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (name_filter is None or name_filter(entry.name)) and entry_is_file(entry):
+                yield entry
+
+def entry_is_file(entry):
+    """Check whether a directory entry is a file, like os.path.isfile(...).
+
+    Args:
+        entry (os.DirEntry): The directory entry to check.
+
+    Returns:
+        bool: Whether the entry is a file. False if it couldn't be checked, like
+        for a symlink that loops back on itself.
+    """
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+def entry_is_dir(entry):
+    """Check whether a directory entry is a directory, like os.path.isdir(...).
+
+    Args:
+        entry (os.DirEntry): The directory entry to check.
+
+    Returns:
+        bool: Whether the entry is a directory. False if it couldn't be checked,
+        like for a symlink that loops back on itself.
+    """
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+def stat(path):
+    """Get the status of a file, like os.stat(...), reusing the status of a file
+    being checked if it has already been fetched.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        os.stat_result: The status of the file.
+    """
+    entry = FILE_ENTRIES.get(path)
+    if entry is None:
+        return os.stat(path)
+    return entry.stat()
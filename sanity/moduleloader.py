@@ -5,24 +5,63 @@ Author:
     Sam Gibson <samolivergibson@gmail.com>
 """
 
+from collections.abc import Mapping
 import importlib
 import importlib.util
-import inspect
-from os import listdir
-from os.path import isfile, join, splitext, exists
+from inspect import CO_VARARGS, CO_VARKEYWORDS
+from os.path import splitext, exists
 
-VALID_MODULE_EXTENSIONS = [
+import sanity.fs
+
+VALID_MODULE_EXTENSIONS = frozenset([
     ".py"
-]
-"""list[str]: The file extensions valid for a checker module."""
+])
+"""frozenset[str]: The file extensions valid for a checker module."""
 
-IGNORE_MODULE_NAMES = [
+IGNORE_MODULE_NAMES = frozenset([
     "__init__.py"
-]
-"""list[str]: File names to be ignored when loading modules from a directory."""
+])
+"""frozenset[str]: File names to be ignored when loading modules from a directory."""
+
+DESIRED_CHECK_ARGS = ("path", "params")
+"""tuple[str]: The desired argument names of a check() function in a checker module. It
+shouldn't take any other arguments, and none of them should have default values."""
+
+class LazyCheckerDict(Mapping):
+    """Maps checker module names to their check() functions, only importing each
+    module the first time its check() function is looked up. This means modules
+    that none of the rules use are never imported.
+
+    Args:
+        module_paths (dict[str, str]): Maps module names to the paths of the modules.
+
+    Raises:
+        ImportError: When looking up a check() function, if its module was malformed
+            in any way.
+
+    Attributes:
+        module_paths (dict[str, str]): See Args.
+        loaded_checkers (dict[str, func]): The check() functions loaded so far.
+    """
+    def __init__(self, module_paths):
+        self.module_paths = module_paths
+        self.loaded_checkers = {}
+
+    def __getitem__(self, module_name):
+        if module_name not in self.loaded_checkers:
+            module_path = self.module_paths[module_name]
+            self.loaded_checkers[module_name] = load_checker_module(module_path, module_name)
+        return self.loaded_checkers[module_name]
+
+    def __contains__(self, module_name):
+        # don't import the module just to check it exists
+        return module_name in self.module_paths
 
-DESIRED_CHECK_ARGSPEC = inspect.ArgSpec(args=['path', 'params'], varargs=None, keywords=None, defaults=None)
-"""inspect.ArgSpec: The desired signature of a check() function in a checker module."""
+    def __iter__(self):
+        return iter(self.module_paths)
+
+    def __len__(self):
+        return len(self.module_paths)
 
 def validate_checker_function(checker_func):
     """Check to see if a loaded check() function has the correct signature."""
@@ -30,9 +69,16 @@ def validate_checker_function(checker_func):
     if not callable(checker_func):
         return False
 
-    # now check to see if it has the right signature
-    spec = inspect.getargspec(checker_func)
-    if spec != DESIRED_CHECK_ARGSPEC:
+    # now check to see if it has the right signature, reading it straight from the
+    # function's code object rather than building a whole signature with inspect
+    code = getattr(checker_func, "__code__", None)
+    if code is None:
+        return False
+    if code.co_argcount != len(DESIRED_CHECK_ARGS) or code.co_kwonlyargcount != 0:
+        return False
+    if code.co_varnames[:code.co_argcount] != DESIRED_CHECK_ARGS:
+        return False
+    if code.co_flags & (CO_VARARGS | CO_VARKEYWORDS) or checker_func.__defaults__:
         return False
 
     return True
@@ -51,7 +97,7 @@ def load_checker_function(module):
         checker_func = getattr(module, "check")
         if not validate_checker_function(checker_func):
             raise ImportError(f"Module {module.__file__} check() function malformed!"
-                              " Expected 'def check(directory):'")
+                              " Expected 'def check(path, params):'")
         return checker_func
     except AttributeError:
         raise ImportError(f"Module {module.__file__} did not have check() function!")
@@ -74,31 +120,40 @@ def load_checker_module(module_path, module_name):
     spec.loader.exec_module(module)
     return load_checker_function(module)
 
+def is_module_name(file_name):
+    """Check whether a file name is one that checker modules can be loaded from.
+
+    Args:
+        file_name (str): The name of the file, not including its directory.
+
+    Returns:
+        bool: Whether a checker module can be loaded from the file.
+    """
+    return splitext(file_name)[1] in VALID_MODULE_EXTENSIONS and file_name not in IGNORE_MODULE_NAMES
+
 def load_checker_modules(directory):
-    """Load all modules present in a given directory.
+    """Find all modules present in a given directory, ready to be loaded when
+    their check() functions are first used.
 
     Args:
         directory (str): The path to the directory to load from.
 
     Raises:
         ValueError: If the given directory did not exist.
-        ImportError: If the imported module was malformed in any way.
 
     Returns:
-        dict[str, func]: Maps module names to their loaded check() functions.
+        LazyCheckerDict: Maps module names to their check() functions. Raises
+        ImportError when looking up a module that was malformed in any way.
     """
     # first check if the directory exists
     if not exists(directory):
         raise ValueError(f"Directory '{directory}' did not exist!")
 
-    checkers = {}
+    module_paths = {}
 
-    # now load every .py file in the directory's check() function
-    for file in [f for f in listdir(directory) if isfile(join(directory, f))]:
-        filename, ext = splitext(file)
-        # check to see if this file is valid for loading
-        if ext in VALID_MODULE_EXTENSIONS and file not in IGNORE_MODULE_NAMES:
-            func = load_checker_module(join(directory, file), filename)
-            checkers[filename] = func
+    # now find every .py file in the directory to load its check() function from
+    # check the name is valid for loading before checking if it's actually a file
+    for entry in sanity.fs.iter_files(directory, is_module_name):
+        module_paths[splitext(entry.name)[0]] = entry.path
 
-    return checkers
\ No newline at end of file
+    return LazyCheckerDict(module_paths)
\ No newline at end of file
@@ -9,21 +9,129 @@ Author:
 
 import re
 
+COMPILED_RULE_RES = {}
+"""dict[str, re.Pattern]: Every rule regex compiled so far, so that regexes used by
+more than one rule are only compiled once."""
+
+REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+"""frozenset[str]: Characters with a special meaning in a regex when not escaped."""
+
+class FastRuleMatcher:
+    """Stands in for a compiled regex of the form '^prefix.*suffix$', where the
+    prefix and suffix are plain text. Matches using string methods rather than
+    the regex engine, which is much quicker for these simple rules.
+
+    Only the truthiness of the results of match() and fullmatch() should be used.
+
+    Args:
+        prefix (str): The text a matching string must start with.
+        suffix (str): The text a matching string must end with.
+        regex (re.Pattern): The compiled regex. Used for strings containing a
+            newline, as '.' and '$' treat these specially.
+
+    Attributes:
+        pattern (str): The regex this matcher stands in for.
+        See Args.
+    """
+    def __init__(self, prefix, suffix, regex):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.regex = regex
+        self.pattern = regex.pattern
+        self.min_length = len(prefix) + len(suffix)
+
+    def match(self, string):
+        if "\n" in string:
+            return self.regex.match(string)
+        return (len(string) >= self.min_length and string.startswith(self.prefix)
+                and string.endswith(self.suffix))
+
+    def fullmatch(self, string):
+        if "\n" in string:
+            return self.regex.fullmatch(string)
+        return (len(string) >= self.min_length and string.startswith(self.prefix)
+                and string.endswith(self.suffix))
+
+    def filter_files(self, files):
+        """Get the paths of the files whose names this matcher fully matches.
+
+        Args:
+            files (arr[(str, str)]): A list containing the name and path of all
+                files to filter.
+
+        Returns:
+            list[str]: Paths of matching files.
+        """
+        fullmatch = self.regex.fullmatch
+        if not self.prefix and not self.suffix:
+            # matches everything, so the only names worth looking at are the
+            # ones with newlines in them
+            return [path for name, path in files if "\n" not in name or fullmatch(name)]
+        prefix, suffix, min_length = self.prefix, self.suffix, self.min_length
+        return [path for name, path in files
+                if ((len(name) >= min_length and name.startswith(prefix)
+                     and name.endswith(suffix))
+                    if "\n" not in name else fullmatch(name))]
+
+class LiteralRuleMatcher:
+    """Stands in for a compiled regex of the form '^literal$', where the literal is
+    plain text. Matches by comparing strings rather than using the regex engine.
+
+    Only the truthiness of the results of match() and fullmatch() should be used.
+
+    Args:
+        literal (str): The text a matching string must be equal to.
+        regex (re.Pattern): The compiled regex.
+
+    Attributes:
+        pattern (str): The regex this matcher stands in for.
+        See Args.
+    """
+    def __init__(self, literal, regex):
+        self.literal = literal
+        self.regex = regex
+        self.pattern = regex.pattern
+
+    def match(self, string):
+        # '$' also matches just before a newline at the end of the string
+        return string == self.literal or string == self.literal + "\n"
+
+    def fullmatch(self, string):
+        return string == self.literal
+
+    def filter_files(self, files):
+        """Get the paths of the files whose names equal the literal.
+
+        Args:
+            files (arr[(str, str)]): A list containing the name and path of all
+                files to filter.
+
+        Returns:
+            list[str]: Paths of matching files.
+        """
+        literal = self.literal
+        return [path for name, path in files if name == literal]
+
 class FileCheckerRule:
-    """Stores a compiled filename matcher regular expression and an array of
-    checker name matcher regular expressions, intended to be executed when
-    checking the asset files individually in the directory.
+    """Stores a compiled filename matcher regular expression and a checker name
+    matcher regular expression, intended to be executed when checking the asset
+    files individually in the directory.
 
     Args:
-        file_name (re.Pattern): The compiled filename regex.
-        checker_names (list[re.Pattern]): The compiled checker name regexes.
+        file_name (re.Pattern): The compiled filename regex. This is matched
+            against the whole name of a file, not including its directory.
+        checker_names (tuple[re.Pattern]): The rule's compiled checker name regexes.
+            A checker is run if any of them match its name.
 
     Attributes:
+        extension (str): The extension a file must have to match this rule,
+            or None if the rule could match files with any extension.
         See Args.
     """
     def __init__(self, file_name, checker_names):
         self.file_name = file_name
         self.checker_names = checker_names
+        self.extension = get_rule_extension(file_name)
 
 class RuleError(Exception):
     """Raised when there was some error compiling a rule."""
@@ -34,6 +142,95 @@ class RuleError(Exception):
     def __str__(self):
         return f"Bad rule '{self.rule_name}', {self.message}"
 
+def parse_literal_re(regex):
+    """Get the plain text a piece of regex matches, if it only matches plain text.
+
+    Args:
+        regex (str): The piece of regex to parse.
+
+    Returns:
+        str: The text the regex matches, or None if it could match anything else.
+    """
+    literal = []
+    escaped = False
+    for char in regex:
+        if escaped:
+            # escaped letters and numbers are special, like '\d' or '\1'
+            if char.isalnum():
+                return None
+            literal.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in REGEX_SPECIAL_CHARS:
+            return None
+        else:
+            literal.append(char)
+    if escaped:
+        return None
+    return "".join(literal)
+
+def parse_simple_rule_re(regex):
+    """Check to see if a regex is of the form '^prefix.*suffix$', where the prefix
+    and suffix are plain text.
+
+    Args:
+        regex (str): The regex to check.
+
+    Returns:
+        (str, str): The prefix and suffix, or None if the regex wasn't of this form.
+    """
+    body = regex[1:] if regex.startswith("^") else regex
+    anchored_end = body.endswith("$") and not body.endswith("\\$")
+    if anchored_end:
+        body = body[:-1]
+
+    prefix_re, separator, suffix_re = body.partition(".*")
+    if not separator:
+        return None
+    prefix = parse_literal_re(prefix_re)
+    suffix = parse_literal_re(suffix_re)
+    if prefix is None or suffix is None:
+        return None
+    # without the '$' a suffix could match anywhere, not just at the end
+    if suffix and not anchored_end:
+        return None
+    return prefix, suffix
+
+def parse_literal_rule_re(regex):
+    """Check to see if a regex is of the form '^literal$', where the literal is
+    plain text.
+
+    Args:
+        regex (str): The regex to check.
+
+    Returns:
+        str: The literal, or None if the regex wasn't of this form.
+    """
+    if not regex.startswith("^") or not regex.endswith("$") or regex.endswith("\\$"):
+        return None
+    return parse_literal_re(regex[1:-1])
+
+def get_fast_matcher(regex, compiled):
+    """Get a matcher that skips the regex engine for a simple regex.
+
+    Args:
+        regex (str): The regex.
+        compiled (re.Pattern): The regex, compiled.
+
+    Returns:
+        re.Pattern: A LiteralRuleMatcher or FastRuleMatcher if the regex is simple
+        enough, otherwise the compiled regex.
+    """
+    literal = parse_literal_rule_re(regex)
+    if literal is not None:
+        return LiteralRuleMatcher(literal, compiled)
+    simple_rule = parse_simple_rule_re(regex)
+    if simple_rule is not None:
+        prefix, suffix = simple_rule
+        return FastRuleMatcher(prefix, suffix, compiled)
+    return compiled
+
 def compile_rule_re(regex, rule_name):
     """Try compiling a rule's regex expression.
 
@@ -45,13 +242,95 @@ def compile_rule_re(regex, rule_name):
         RuleError: If the rule could not be compiled.
 
     Returns:
-        re.Pattern: The compiled rule.
+        re.Pattern: The compiled rule. Simple rules are given a LiteralRuleMatcher
+        or FastRuleMatcher, which can be used in the same way.
     """
+    compiled = COMPILED_RULE_RES.get(regex)
+    if compiled is not None:
+        return compiled
     try:
-        return re.compile(regex)
+        compiled = re.compile(regex)
     except re.error as exc:
         raise RuleError(f"Could not compile regex {regex}, {str(exc)}", rule_name)
 
+    # simple rules can skip the regex engine
+    compiled = get_fast_matcher(regex, compiled)
+    COMPILED_RULE_RES[regex] = compiled
+    return compiled
+
+def compile_combined_rule_re(regexes, rule_name):
+    """Try compiling a list of a rule's regex expressions into a single regex
+    that matches wherever any of them would match.
+
+    Args:
+        regexes (list[str]): The regexes to combine.
+        rule_name (str): The name of the rule. Used to display helpful error info.
+
+    Raises:
+        RuleError: If the rule could not be compiled.
+
+    Returns:
+        re.Pattern: The compiled rule.
+    """
+    # compile each one on its own first, so any error points at the bad regex
+    for regex in regexes:
+        compile_rule_re(regex, rule_name)
+
+    if len(regexes) == 0:
+        # an empty alternation would match everything, so match nothing instead
+        return compile_rule_re("(?!)", rule_name)
+    if len(regexes) == 1:
+        return compile_rule_re(regexes[0], rule_name)
+    return compile_rule_re("|".join(f"(?:{regex})" for regex in regexes), rule_name)
+
+def get_extension(file_name):
+    """Get the extension of a file name - everything from the last '.' onwards.
+
+    Unlike os.path.splitext(...) a name starting with a '.' is treated as an
+    extension, as rules match against the whole name.
+
+    Returns:
+        str: The extension, or an empty string if the name has no '.' in it.
+    """
+    dot_index = file_name.rfind(".")
+    if dot_index == -1:
+        return ""
+    return file_name[dot_index:]
+
+def get_rule_extension(file_name_rule):
+    """Work out which extension a file must have to match a compiled filename rule.
+
+    This only works for rules given a LiteralRuleMatcher, or a FastRuleMatcher with
+    a '.' in its suffix, as any file matching the rule must end with the suffix.
+
+    Args:
+        file_name_rule (re.Pattern): The compiled filename regex.
+
+    Returns:
+        str: The extension, or None if it couldn't be worked out.
+    """
+    if isinstance(file_name_rule, FastRuleMatcher) and "." in file_name_rule.suffix:
+        return get_extension(file_name_rule.suffix)
+    if isinstance(file_name_rule, LiteralRuleMatcher):
+        return get_extension(file_name_rule.literal)
+    return None
+
+def group_files_by_extension(files):
+    """Group a list of files by their extension.
+
+    Args:
+        files (arr[(str, str)]): A list containing the name and path of all
+            files to group.
+
+    Returns:
+        dict[str, list[(str, str)]]: Maps extensions to the names and paths of the
+        files with that extension.
+    """
+    files_by_extension = {}
+    for name, path in files:
+        files_by_extension.setdefault(get_extension(name), []).append((name, path))
+    return files_by_extension
+
 def compile_file_rules(file_rules):
     """From the parsed file_rules from the config file, compile all of the rules.
 
@@ -71,12 +350,42 @@ def compile_file_rules(file_rules):
         compiled_file_match = compile_rule_re(file_match_re, file_match_re)
 
         # now go through and compile all of the given checker name rules
-        compiled_checker_name_matchers = []
-        for checker_name_re in checker_name_re_arr:
-            compiled_checker_name_matchers.append(compile_rule_re(checker_name_re, file_match_re))
+        compiled_checker_name_matchers = tuple(compile_rule_re(checker_name_re, file_match_re)
+                                               for checker_name_re in checker_name_re_arr)
         compiled_rules[file_match_re] = FileCheckerRule(compiled_file_match, compiled_checker_name_matchers)
     return compiled_rules
 
+def compile_file_rules_prefilter(file_rules):
+    """Compile a single regex matching the names of files that at least one of the
+    compiled file rules would match. Files that no rule matches can then be skipped
+    with one match per file, instead of one match per file per rule.
+
+    Args:
+        file_rules (dict[str, FileCheckerRule]): The compiled file rules.
+
+    Returns:
+        re.Pattern: The combined regex, or None if it wouldn't skip anything (like
+        if a rule matches every file) or the rules couldn't be safely combined.
+    """
+    if len(file_rules) < 2:
+        return None
+    for rule_regex, rule in file_rules.items():
+        if isinstance(rule.file_name, FastRuleMatcher) and not rule.file_name.prefix \
+                and not rule.file_name.suffix:
+            return None
+        # combining renumbers groups, breaking backreferences, and inline flags
+        # would apply to every rule, so the combined regex could skip files a rule
+        # matches on its own
+        compiled = re.compile(rule_regex)
+        if compiled.groups > 0 or compiled.flags != re.UNICODE:
+            return None
+
+    try:
+        return compile_combined_rule_re(list(file_rules.keys()), "file_rules")
+    except RuleError:
+        # some regexes can't be combined, like ones with flags that must come first
+        return None
+
 def compile_directory_rules(dir_rules):
     """From the parsed dir_rules from the config file, compile all of the rules.
 
@@ -97,30 +406,64 @@ def compile_directory_rules(dir_rules):
 
 def filter_files(files, filter_rule):
     """For a given list of files and a compiled regex to match filenames,
-    yield only the files that match.
+    get only the files that match.
 
     Args:
-        files (arr[str]): A list containing all files to filter.
-        filter_rule (re.Pattern): A regex to match filenames against.
+        files (arr[(str, str)]): A list containing the name and path of all
+            files to filter.
+        filter_rule (re.Pattern): A regex to match filenames against. It must
+            match the entire name of the file.
 
-    Yields:
-        str: Filenames of matching files.
+    Returns:
+        list[str]: Paths of matching files.
     """
-    for file in files:
-        if filter_rule.match(file):
-            yield file
+    if isinstance(filter_rule, (FastRuleMatcher, LiteralRuleMatcher)):
+        return filter_rule.filter_files(files)
+    # look the match function up once, rather than once per file
+    fullmatch = filter_rule.fullmatch
+    return [path for name, path in files if fullmatch(name)]
 
-def filter_checkers(checkers, filter_rule):
-    """For a given list of checkers and a compiled regex to match checker names,
-    yield only the checkers that match.
+def filter_checkers(checkers, filter_rules):
+    """For a given list of checkers and compiled regexes to match checker names,
+    yield the checkers each regex matches in turn. A checker matched by more than
+    one of the regexes is yielded once for each of them.
 
     Args:
-        checkers (dict[str, func]): A map of checker names to loaded check() functions.
-        filter_rule (re.Pattern): A regex to match filenames against.
+        checkers (Mapping[str, func]): A map of checker names to loaded check() functions.
+        filter_rules (tuple[re.Pattern]): The regexes to match checker names against.
 
     Yields:
         (str, func): The checker name and check() function of matching checkers.
     """
-    for checker_name, checker_func in checkers.items():
-        if filter_rule.match(checker_name):
-            yield checker_name, checker_func
\ No newline at end of file
+    for filter_rule in filter_rules:
+        for checker_name in checkers:
+            if filter_rule.match(checker_name):
+                # only look the function up once it's matched, so unused checkers aren't loaded
+                yield checker_name, checkers[checker_name]
+
+def build_checker_dispatch(checkers, checker_rules, checker_params):
+    """Match every rule's compiled checker name regexes against the loaded checkers up
+    front, so that running a rule doesn't need to do any regex matching or param lookups.
+
+    Args:
+        checkers (Mapping[str, func]): A map of checker names to loaded check() functions.
+        checker_rules (iterable[tuple[re.Pattern]]): The compiled checker name regexes
+            of each rule.
+        checker_params (Mapping[str, Mapping[str, value]]): The params to give each
+            checker, with an entry for every checker.
+
+    Raises:
+        ImportError: If a matched checker's module was malformed in any way.
+
+    Returns:
+        dict[tuple[re.Pattern], tuple[(str, func, Mapping)]]: Maps the checker name
+        regexes of each rule to the checker names, check() functions and params of the
+        checkers they match.
+    """
+    dispatch = {}
+    for checker_rule in checker_rules:
+        if checker_rule not in dispatch:
+            dispatch[checker_rule] = tuple((checker_name, checker_func, checker_params[checker_name])
+                                           for checker_name, checker_func
+                                           in filter_checkers(checkers, checker_rule))
+    return dispatch
\ No newline at end of file
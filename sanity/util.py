@@ -4,10 +4,33 @@ Author:
     Sam Gibson <samolivergibson@gmail.com>
 """
 
+import sys
+
 TAB_WIDTH = 4
 """int: The width (in spaces) of a printed tab character."""
 
+OUTPUT_BUFFER = []
+"""list[str]: Lines printed with print_depth(...) that haven't been written out yet."""
+
+class NoColor:
+    """Stands in for colorama's Fore and Style when color codes shouldn't be
+    printed, like when output is redirected to a file."""
+    GREEN = ""
+    RED = ""
+    RESET_ALL = ""
+
 def print_depth(msg, depth=0):
-    """Print a message at a given tab depth."""
+    """Print a message at a given tab depth.
+
+    The message is buffered until flush_output() is called, so that lots of
+    messages can be written out at once.
+    """
     depth_str = " " * TAB_WIDTH * depth
-    print(depth_str + msg)
\ No newline at end of file
+    OUTPUT_BUFFER.append(depth_str + msg)
+
+def flush_output():
+    """Write out all of the messages printed since the last flush."""
+    if len(OUTPUT_BUFFER) > 0:
+        sys.stdout.write("\n".join(OUTPUT_BUFFER) + "\n")
+        sys.stdout.flush()
+        OUTPUT_BUFFER.clear()